@@ -1,15 +1,21 @@
 import enum
-import math
+import os
+from types import MappingProxyType
 from time import sleep
-from typing import Any, Callable, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Tuple
 
 import matplotlib
 import matplotlib.font_manager as font_manager
-from matplotlib.patches import Patch
+from matplotlib.patches import Circle, Patch
 import matplotlib.pyplot as plt
 from matplotlib.backend_bases import MouseButton
+from matplotlib.text import Text
 
-matplotlib.use("TkAgg")
+# Backend can be overridden, e.g. MUEHLE_MPL_BACKEND=Agg for headless runs
+matplotlib.use(os.environ.get("MUEHLE_MPL_BACKEND", "TkAgg"))
+matplotlib.rcParams["path.simplify"] = True
+matplotlib.rcParams["path.simplify_threshold"] = 1.0
+matplotlib.rcParams["agg.path.chunksize"] = 10000
 
 
 class Event(enum.Enum):
@@ -24,91 +30,94 @@ class Color(enum.Enum):
     BLACK = "black"
 
 
+# Board coordinates of the positions, indexed by position number
+_VALID_POS: Tuple[Tuple[int, int], ...] = (
+    (0, 6),
+    (3, 6),
+    (6, 6),
+    (1, 5),
+    (3, 5),
+    (5, 5),
+    (2, 4),
+    (3, 4),
+    (4, 4),
+    (0, 3),
+    (1, 3),
+    (2, 3),
+    (4, 3),
+    (5, 3),
+    (6, 3),
+    (2, 2),
+    (3, 2),
+    (4, 2),
+    (1, 1),
+    (3, 1),
+    (5, 1),
+    (0, 0),
+    (3, 0),
+    (6, 0),
+)
+_VALID_POS_REVERSE: Mapping[Tuple[int, int], int] = MappingProxyType(
+    {coord: position for position, coord in enumerate(_VALID_POS)}
+)
+_NUM_POSITIONS: int = len(_VALID_POS)
+
+_INFO_FONT = font_manager.FontProperties(size=14)
+
+
+def _bit_positions(mask: int) -> Iterator[int]:
+    """
+    Yields the positions of all set bits in a board mask, lowest first.
+    :param mask: bit mask with one bit per board position.
+    """
+    while mask:
+        lsb = mask & -mask
+        yield lsb.bit_length() - 1
+        mask ^= lsb
+
+
 """
 Visualization of a mill game board.
 """
 
 
 class MillGameBoard:
-    _click_handlers: List[Callable[[Optional[int]], None]] = []
-    _event_handlers: List[Callable[[
-        Event, Optional[Dict[str, Any]]], None]] = []
     _information_text: str = ""
     _max_click_dist: float = 0.18
-    _valid_positions: Dict[int, Tuple[int, int]] = {
-        0: (0, 6),
-        1: (3, 6),
-        2: (6, 6),
-        3: (1, 5),
-        4: (3, 5),
-        5: (5, 5),
-        6: (2, 4),
-        7: (3, 4),
-        8: (4, 4),
-        9: (0, 3),
-        10: (1, 3),
-        11: (2, 3),
-        12: (4, 3),
-        13: (5, 3),
-        14: (6, 3),
-        15: (2, 2),
-        16: (3, 2),
-        17: (4, 2),
-        18: (1, 1),
-        19: (3, 1),
-        20: (5, 1),
-        21: (0, 0),
-        22: (3, 0),
-        23: (6, 0),
-    }
-    _valid_positions_reverse: Dict[Tuple[int, int], int] = dict(
-        zip(_valid_positions.values(), _valid_positions.keys())
-    )
     _color_config: Dict[Color, str] = {
         Color.WHITE: "white", Color.BLACK: "black"}
-    _event_queue: List[Tuple[Event, Optional[Dict[str, Any]]]] = []
 
     def __init__(self):
-        self._stones: Dict[int, Color] = {}
+        self._click_handlers: List[Callable[[Optional[int]], None]] = []
+        self._event_handlers: List[Callable[[
+            Event, Optional[Dict[str, Any]]], None]] = []
+        self._event_queue: List[Tuple[Event, Optional[Dict[str, Any]]]] = []
+        # One bit per position for each color
+        self._white: int = 0
+        self._black: int = 0
         self._selected_pos: Optional[int] = None
         self._fig: Any
         self._ax: Any
         self._fig, self._ax = plt.subplots(figsize=(7, 7))  # type: ignore
+        self._bg: Any = None
+        self._stone_artists: Dict[int, Circle] = {}
+        self._info_text_artist: Text
+        self._init_static_artists()
         self._fig.canvas.mpl_connect("button_press_event", self._on_click)
+        self._fig.canvas.mpl_connect("draw_event", self._on_draw)
+        self._fig.canvas.draw()
 
     def draw_board(self):
         """
         Draws the Mill game board and all stones.
-        """
-        self._ax.cla()
-        self._ax.axis("off")
-        # Draw the three rectangles (concentric squares)
-        rect: Patch = plt.Rectangle(
-            (0, 0), 6, 6, fill=False, color="black", linewidth=2)  # type: ignore
-        self._ax.add_patch(rect)
-        rect = plt.Rectangle((1, 1), 4, 4, fill=False,
-                             color="black", linewidth=2)  # type: ignore
-        self._ax.add_patch(rect)
-        rect = plt.Rectangle((2, 2), 2, 2, fill=False,
-                             color="black", linewidth=2)  # type: ignore
-        self._ax.add_patch(rect)
-
-        # Draw the connecting lines between rectangles
-        self._ax.plot([3, 3], [0, 2], color="black", linewidth=2)
-        self._ax.plot([3, 3], [4, 6], color="black", linewidth=2)
-        self._ax.plot([0, 2], [3, 3], color="black", linewidth=2)
-        self._ax.plot([4, 6], [3, 3], color="black", linewidth=2)
-
-        # Draw the points at intersections
-        for _pos, coord in self._valid_positions.items():
-            self._ax.plot(coord[0], coord[1], "o", color="black", markersize=5)
-
-        # Add the stones
-        for position, color in self._stones.items():
-            self._draw_stone(self._ax, position, color)
-
-        # Add informational text
-        self._draw_information_text()
+        Only the stones and the information text are redrawn, the static board is restored from the cached background.
+        """
+        canvas = self._fig.canvas
+        self._update_animated_artists()
+        if self._bg is not None:
+            canvas.restore_region(self._bg)
+            self._draw_animated_artists()
+            canvas.blit(self._fig.bbox)
         plt.show()  # type: ignore
 
     def set_information_text(self, text: str) -> None:
@@ -124,37 +133,38 @@ class MillGameBoard:
         :param position: number for the stone position.
         :param color: "black" or "white".
         """
-        if color not in Color:
+        if color is not Color.WHITE and color is not Color.BLACK:
             raise ValueError("Stone color must be 'black' or 'white'.")
-
         # Check if the position is a valid crossing
-        if position in self._valid_positions:
-            self._stones[position] = color
-            self.select_stone(None)
-            self._on_event(Event.STONE_SET, {
-                           "color": color, "position": position})
-        else:
+        if not 0 <= position < _NUM_POSITIONS:
             raise ValueError(
                 "Invalid position. Stones can only be placed on crossings."
             )
 
+        bit = 1 << position
+        if color is Color.WHITE:
+            self._white |= bit
+            self._black &= ~bit
+        else:
+            self._black |= bit
+            self._white &= ~bit
+        self.select_stone(None)
+        self._on_event(Event.STONE_SET, {
+                       "color": color, "position": position})
+
     def remove_stone(self, position: int) -> None:
         """
         Removes a stone from the board.
         :param position: number for the stone position.
         """
-        # Check if the position is a valid crossing
-        if position in self._valid_positions:
-            color = self._stones.get(position)
-            if color != None:
-                self.select_stone(None)
-                del self._stones[position]
-                self._on_event(Event.STONE_REMOVED, {
-                               "color": color, "position": position})
-        else:
-            raise ValueError(
-                "Invalid position. Stones can only be placed on crossings."
-            )
+        # get_stone_col checks if the position is a valid crossing
+        color = self.get_stone_col(position)
+        if color is not None:
+            self.select_stone(None)
+            self._white &= ~(1 << position)
+            self._black &= ~(1 << position)
+            self._on_event(Event.STONE_REMOVED, {
+                           "color": color, "position": position})
 
     def move_stone(self, from_pos: int, to_pos: int):
         """
@@ -162,42 +172,78 @@ class MillGameBoard:
         :param from_pos: position of the stone to move.
         :param to_pos: position to move the stone to.
         """
-        # Check if the position is a valid crossing
-        if from_pos in self._valid_positions and to_pos in self._valid_positions:
-            stone_col = self._stones.get(from_pos)
-            if stone_col != None:
-                del self._stones[from_pos]
-                self._stones[to_pos] = stone_col
-                self.select_stone(None)
-                self._on_event(Event.STONE_MOVED, {
-                               "color": stone_col, "from": from_pos, "to": to_pos})
-
-        else:
+        # Check if the position is a valid crossing, get_stone_col checks from_pos
+        if not 0 <= to_pos < _NUM_POSITIONS:
             raise ValueError(
                 "Invalid position. Stones can only be placed on crossings."
             )
 
+        stone_col = self.get_stone_col(from_pos)
+        if stone_col is not None:
+            if stone_col is Color.WHITE:
+                self._white = (self._white & ~(1 << from_pos)) | (1 << to_pos)
+                self._black &= ~(1 << to_pos)
+            else:
+                self._black = (self._black & ~(1 << from_pos)) | (1 << to_pos)
+                self._white &= ~(1 << to_pos)
+            self.select_stone(None)
+            self._on_event(Event.STONE_MOVED, {
+                           "color": stone_col, "from": from_pos, "to": to_pos})
+
     def get_stone_col(self, position: int) -> Optional[Color]:
         """
         Gets the color of a stone on a position on the board.
         :param position: number of the position.
         """
         # Check if the position is a valid crossing
-        if position in self._valid_positions:
-            if position in self._stones:
-                return self._stones.get(position)
-            else:
-                return None
-        else:
+        if not 0 <= position < _NUM_POSITIONS:
             raise ValueError(
                 "Invalid position. Stones can only be placed on crossings."
             )
 
+        if (self._white >> position) & 1:
+            return Color.WHITE
+        elif (self._black >> position) & 1:
+            return Color.BLACK
+        else:
+            return None
+
     def get_stones(self) -> Dict[int, Color]:
         """
         Gets all stones on the board.
+        The dictionary is built on each call, use count_white/count_black or get_stone_col where possible.
+        """
+        stones: Dict[int, Color] = {}
+        for position in _bit_positions(self._white):
+            stones[position] = Color.WHITE
+        for position in _bit_positions(self._black):
+            stones[position] = Color.BLACK
+        return stones
+
+    def get_mask(self, color: Color) -> int:
+        """
+        Gets the stones of a color as bit mask with one bit per position.
+        :param color: the color of the stones.
         """
-        return self._stones
+        return self._white if color is Color.WHITE else self._black
+
+    def get_occupied_mask(self) -> int:
+        """
+        Gets all occupied positions as bit mask with one bit per position.
+        """
+        return self._white | self._black
+
+    def count_white(self) -> int:
+        """
+        Gets the number of white stones on the board.
+        """
+        return self._white.bit_count()
+
+    def count_black(self) -> int:
+        """
+        Gets the number of black stones on the board.
+        """
+        return self._black.bit_count()
 
     def select_stone(self, position: Optional[int]) -> None:
         """
@@ -205,7 +251,7 @@ class MillGameBoard:
         :param position: number of the position.
         """
         # Check if the position is a valid crossing
-        if position != None and position in self._valid_positions and position in self._stones:
+        if position is not None and 0 <= position < _NUM_POSITIONS and ((self._white | self._black) >> position) & 1:
             self._selected_pos = position
         else:
             self._selected_pos = None
@@ -220,10 +266,28 @@ class MillGameBoard:
         """
         Clears all stones from the board.
         """
-        self._stones = {}
+        self._white = 0
+        self._black = 0
         self.select_stone(None)
         self._on_event(Event.RESET, None)
 
+    def snapshot(self) -> Tuple[int, int, Optional[int], Tuple[Tuple[Event, Optional[Dict[str, Any]]], ...]]:
+        """
+        Returns the stones, the selection and the pending (not yet delivered) events on the board,
+        e.g. to undo a move in a game tree search.
+        """
+        return (self._white, self._black, self._selected_pos, tuple(self._event_queue))
+
+    def restore(self, snapshot: Tuple[int, int, Optional[int], Tuple[Tuple[Event, Optional[Dict[str, Any]]], ...]]) -> None:
+        """
+        Restores stones, selection and pending events formerly returned by snapshot.
+        Events queued after the snapshot are discarded, so they are never delivered to the handlers.
+        No events are raised, so a rules engine must be restored separately (see MillRules.restore).
+        :param snapshot: the state to restore.
+        """
+        (self._white, self._black, self._selected_pos, events) = snapshot
+        self._event_queue[:] = events
+
     def register_click_handler(self, handler: Callable[[Optional[int]], None]) -> None:
         """
         Registers a handler function that is called on left button click with the click position.
@@ -256,33 +320,105 @@ class MillGameBoard:
         """
         self._event_handlers.remove(handler)
 
-    def _draw_information_text(self) -> None:
+    def _init_static_artists(self) -> None:
         """
-        Draws text above the board.
+        Draws the static board once and creates the (initially invisible) artists for stones and text.
         """
-        font_prop = font_manager.FontProperties(size=14)
-        matplotlib.pyplot.text(  # type: ignore
+        self._ax.axis("off")
+        # Fixed limits and equal aspect, so the (invisible) stone circles do not widen the board
+        # and stay round in any window shape
+        self._ax.set_xlim(-0.3, 6.3)
+        self._ax.set_ylim(-0.3, 6.3)
+        self._ax.set_aspect("equal")
+        # Draw the three rectangles (concentric squares)
+        rect: Patch = plt.Rectangle(
+            (0, 0), 6, 6, fill=False, color="black", linewidth=2)  # type: ignore
+        self._ax.add_patch(rect)
+        rect = plt.Rectangle((1, 1), 4, 4, fill=False,
+                             color="black", linewidth=2)  # type: ignore
+        self._ax.add_patch(rect)
+        rect = plt.Rectangle((2, 2), 2, 2, fill=False,
+                             color="black", linewidth=2)  # type: ignore
+        self._ax.add_patch(rect)
+
+        # Draw the connecting lines between rectangles
+        self._ax.plot([3, 3], [0, 2], color="black", linewidth=2)
+        self._ax.plot([3, 3], [4, 6], color="black", linewidth=2)
+        self._ax.plot([0, 2], [3, 3], color="black", linewidth=2)
+        self._ax.plot([4, 6], [3, 3], color="black", linewidth=2)
+
+        # Draw the points at intersections
+        (x_coords, y_coords) = zip(*_VALID_POS)
+        self._ax.plot(x_coords, y_coords, "o", color="black", markersize=5)
+
+        # Create one circle per position, shown only when a stone is set
+        for position, coord in enumerate(_VALID_POS):
+            circle = Circle(coord, 0.17, animated=True, visible=False)
+            self._ax.add_patch(circle)
+            self._stone_artists[position] = circle
+
+        # Create the informational text
+        self._info_text_artist = self._ax.text(
             3,
             6.7,
-            self._information_text,
+            "",
             horizontalalignment="center",
-            fontproperties=font_prop,
+            fontproperties=_INFO_FONT,
+            animated=True,
         )
 
-    def _draw_stone(self, ax: Any, position: int, color: Color) -> None:
+    def _update_animated_artists(self) -> None:
+        """
+        Updates the stone and text artists to the current board state.
+        """
+        for circle in self._stone_artists.values():
+            circle.set_visible(False)
+        for position in _bit_positions(self._white):
+            self._draw_stone(position, Color.WHITE)
+        for position in _bit_positions(self._black):
+            self._draw_stone(position, Color.BLACK)
+        self._draw_information_text()
+
+    def _draw_animated_artists(self) -> None:
+        """
+        Renders all visible stone artists and the information text onto the canvas.
+        """
+        for circle in self._stone_artists.values():
+            if circle.get_visible():
+                self._ax.draw_artist(circle)
+        self._ax.draw_artist(self._info_text_artist)
+
+    def _draw_information_text(self) -> None:
+        """
+        Draws text above the board.
+        """
+        self._info_text_artist.set_text(self._information_text)
+
+    def _draw_stone(self, position: int, color: Color) -> None:
         """
         Draws a game stone at the specified position.
-        :param ax: Matplotlib axis.
         :param position: number for the stone position.
         :param color: "black" or "white" for the stone color.
         """
-        (x, y) = self._valid_positions[position]
+        circle = self._stone_artists[position]
         if position == self._selected_pos:
-            ax.plot(x, y, "o", color="red", markersize=20)
-            ax.plot(x, y, "o", color=self._color_config[color], markersize=14)
+            circle.set_radius(0.18)
+            circle.set_edgecolor("red")
+            circle.set_linewidth(3)
         else:
-            ax.plot(x, y, "o", color="black", markersize=17)
-            ax.plot(x, y, "o", color=self._color_config[color], markersize=15)
+            circle.set_radius(0.17)
+            circle.set_edgecolor("black")
+            circle.set_linewidth(2)
+        circle.set_facecolor(self._color_config[color])
+        circle.set_visible(True)
+
+    def _on_draw(self, event: Any) -> None:
+        """
+        Is called after every full redraw of the canvas (e.g. on show or resize) and caches the static background.
+        :param event: Matplotlib draw event.
+        """
+        self._bg = self._fig.canvas.copy_from_bbox(self._fig.bbox)
+        self._draw_animated_artists()
 
     def _on_click(self, event: Any) -> None:
         """
@@ -291,16 +427,14 @@ class MillGameBoard:
         """
         print("Click: ", event)
         position = None
-        if (
-            event.button is MouseButton.LEFT
-            and event.xdata != None
-            and event.ydata != None
-            and math.dist([round(event.xdata)], [event.xdata]) < self._max_click_dist
-            and math.dist([round(event.ydata)], [event.ydata]) < self._max_click_dist
-        ):
+        if event.button is MouseButton.LEFT and event.xdata is not None and event.ydata is not None:
             x = round(event.xdata)
             y = round(event.ydata)
-            position = self._valid_positions_reverse.get((x, y))
+            if (
+                abs(event.xdata - x) < self._max_click_dist
+                and abs(event.ydata - y) < self._max_click_dist
+            ):
+                position = _VALID_POS_REVERSE.get((x, y))
         for handler in self._click_handlers:
             handler(position)
         self._deliver_events()
@@ -1,4 +1,4 @@
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
 from board import Color, Event, MillGameBoard
 from player import HumanPlayer, Player
@@ -7,6 +7,14 @@ from rules import MillRules, NextAction, Phase
 
 class GameController:
     _selected_pos: Optional[int] = None
+    _board_texts: Dict[Tuple[NextAction, Color], str] = {
+        (NextAction.SET, Color.WHITE): "White: Please set stone",
+        (NextAction.SET, Color.BLACK): "Black: Please set stone",
+        (NextAction.MOVE, Color.WHITE): "White: Please move stone",
+        (NextAction.MOVE, Color.BLACK): "Black: Please move stone",
+        (NextAction.REMOVE, Color.WHITE): "White: Please select black stone to remove",
+        (NextAction.REMOVE, Color.BLACK): "Black: Please select white stone to remove",
+    }
 
     def __init__(self):
         self._board = MillGameBoard()
@@ -15,51 +23,50 @@ class GameController:
             self._board, self._rules_engine, Color.WHITE)
         self._player2: Player = HumanPlayer(
             self._board, self._rules_engine, Color.BLACK)
+        # Only the player whose turn it is receives board clicks
+        self._active_player: Player = self._player1
+        self._active_player.activate()
         self._board.register_event_handler(self._board_event_handler)
         self._board.register_click_handler(self._board_click_handler)
 
     def _board_click_handler(self, position: Optional[int]) -> None:
         print("_board_click_handler game_controller")
-        if self._rules_engine.get_phase() == Phase.END:
+        if self._rules_engine.get_phase() is Phase.END:
             self._board.clear_board()
             self._setup_board()
 
     def _board_event_handler(self, event: Event, event_data: Optional[Dict[str, Any]]) -> None:
         print("_board_event_handler game_controller")
-        if event != Event.RESET:
+        self._update_active_player()
+        if event is not Event.RESET:
             self._setup_board()
 
+    def _update_active_player(self) -> None:
+        player = self._player1 if self._rules_engine.is_turn_col(
+            Color.WHITE) else self._player2
+        if player is not self._active_player:
+            self._active_player.deactivate()
+            player.activate()
+            self._active_player = player
+
     def _setup_board(self) -> None:
         text = self._get_board_text()
         self._board.set_information_text(text)
         self._board.draw_board()
 
     def _get_board_text(self) -> str:
-        if self._rules_engine.get_next_action() == NextAction.SET:
-            if self._rules_engine.is_turn_col(Color.WHITE):
-                return "White: Please set stone"
-            else:
-                return "Black: Please set stone"
-        if self._rules_engine.get_next_action() == NextAction.MOVE:
-            if self._rules_engine.is_turn_col(Color.WHITE):
-                return "White: Please move stone"
-            else:
-                return "Black: Please move stone"
-        if self._rules_engine.get_next_action() == NextAction.REMOVE:
-            if self._rules_engine.is_turn_col(Color.WHITE):
-                return "White: Please select black stone to remove"
-            else:
-                return "Black: Please select white stone to remove"
-        if self._rules_engine.get_next_action() == NextAction.RESET:
-            num_black_stones = sum(
-                x == Color.BLACK for x in self._board.get_stones().values())
-            num_white_stones = sum(
-                x == Color.WHITE for x in self._board.get_stones().values())
-            if num_black_stones < num_white_stones:
-                return "White won!! Please click to start new game."
-            else:
-                return "Black won!! Please click to start new game."
-        return ""
+        action = self._rules_engine.get_next_action()
+        if action is NextAction.RESET:
+            return self._get_end_text()
+        color = Color.WHITE if self._rules_engine.is_turn_col(
+            Color.WHITE) else Color.BLACK
+        return self._board_texts[(action, color)]
+
+    def _get_end_text(self) -> str:
+        if self._board.count_black() < self._board.count_white():
+            return "White won!! Please click to start new game."
+        else:
+            return "Black won!! Please click to start new game."
 
     def start(self):
         self._setup_board()
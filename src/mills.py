@@ -0,0 +1,50 @@
+from typing import Tuple
+
+from positions import positions
+
+"""
+Mill lines of the board as bit masks with one bit per position.
+"""
+
+# Every mill line as (left, center, right) or (up, center, down), derived from the position graph
+MILLS: Tuple[Tuple[int, int, int], ...] = tuple(
+    (d.left, pos, d.right)
+    for pos, d in positions.items()
+    if d.left is not None and d.right is not None
+) + tuple(
+    (d.up, pos, d.down)
+    for pos, d in positions.items()
+    if d.up is not None and d.down is not None
+)
+
+MILL_MASKS: Tuple[int, ...] = tuple(
+    (1 << a) | (1 << b) | (1 << c) for a, b, c in MILLS
+)
+
+# The (two) mill masks running through every position
+MILLS_AT: Tuple[Tuple[int, ...], ...] = tuple(
+    tuple(mask for mask in MILL_MASKS if (mask >> pos) & 1) for pos in range(len(positions))
+)
+
+
+def has_mill(mask: int) -> bool:
+    """
+    Checks if the stones in the given mask form at least one mill.
+    :param mask: bit mask of the stones of one color.
+    """
+    for mill in MILL_MASKS:
+        if mask & mill == mill:
+            return True
+    return False
+
+
+def mill_completed_at(mask: int, pos: int) -> bool:
+    """
+    Checks if the stones in the given mask form a mill through the given position.
+    :param mask: bit mask of the stones of one color.
+    :param pos: the position that was just set or moved to.
+    """
+    for mill in MILLS_AT[pos]:
+        if mask & mill == mill:
+            return True
+    return False
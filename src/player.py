@@ -1,8 +1,11 @@
+import logging
 from typing import Optional
 
 from board import Color, MillGameBoard
 from rules import MillRules, NextAction
 
+logger = logging.getLogger(__name__)
+
 
 class Player:
     def __init__(self, board: MillGameBoard, rules_engine: MillRules, color: Color):
@@ -10,26 +13,48 @@ class Player:
         self._rules_engine = rules_engine
         self._color = color
 
+    def activate(self) -> None:
+        """
+        Is called when it becomes the player's turn.
+        """
+        pass
+
+    def deactivate(self) -> None:
+        """
+        Is called when the player's turn ends.
+        """
+        pass
+
 
 class HumanPlayer(Player):
-    def __init__(self, board: MillGameBoard, rules_engine: MillRules, color: Color):
-        super().__init__(board, rules_engine, color)
+    def activate(self) -> None:
+        """
+        Starts handling board clicks for this player.
+        """
         self._board.register_click_handler(self._board_click_handler)
 
+    def deactivate(self) -> None:
+        """
+        Stops handling board clicks for this player.
+        """
+        self._board.unregister_click_handler(self._board_click_handler)
+
     def _board_click_handler(self, position: Optional[int]) -> None:
-        print("_board_click_handler player")
-        if self._rules_engine.is_turn_col(self._color):
-            if self._rules_engine.get_next_action() == NextAction.SET and position != None and self._rules_engine.can_place(position, self._color):
+        logger.debug("_board_click_handler player")
+        action = self._rules_engine.get_next_action()
+        if action is NextAction.SET:
+            if position is not None and self._rules_engine.can_place(position, self._color):
                 self._board.place_stone(position, self._color)
-            if self._rules_engine.get_next_action() == NextAction.MOVE:
-                if position != None:
-                    selected_pos = self._board.get_selection()
-                    if self._rules_engine.may_select(position):
-                        self._board.select_stone(position)
-                    elif selected_pos != None and self._rules_engine.may_move(selected_pos, position):
-                        self._board.move_stone(selected_pos, position)
-                else:
-                    self._board.select_stone(None)
-                self._board.draw_board()
-            if position != None and self._rules_engine.get_next_action() == NextAction.REMOVE and self._rules_engine.may_remove(position):
+        elif action is NextAction.MOVE:
+            if position is not None:
+                selected_pos = self._board.get_selection()
+                if self._rules_engine.may_select(position):
+                    self._board.select_stone(position)
+                elif selected_pos is not None and self._rules_engine.may_move(selected_pos, position):
+                    self._board.move_stone(selected_pos, position)
+            else:
+                self._board.select_stone(None)
+            self._board.draw_board()
+        elif action is NextAction.REMOVE:
+            if position is not None and self._rules_engine.may_remove(position):
                 self._board.remove_stone(position)
@@ -1,5 +1,5 @@
 
-from typing import Dict
+from typing import Dict, Tuple
 
 
 class Directions:
@@ -7,15 +7,21 @@ class Directions:
     left: int | None
     up: int | None
     down: int | None
+    mask: int
 
     def __init__(self, left: int | None, right: int | None, up: int | None, down: int | None):
         self.right = right
         self.left = left
         self.up = up
         self.down = down
+        # Bit mask with one bit per neighbor position
+        self.mask = 0
+        for neighbor in (left, right, up, down):
+            if neighbor is not None:
+                self.mask |= 1 << neighbor
 
     def has_neighbor(self, position: int):
-        return self.right == position or self.left == position or self.up == position or self.down == position
+        return (self.mask >> position) & 1 == 1
 
 
 positions: Dict[int, Directions] = {
@@ -44,3 +50,50 @@ positions: Dict[int, Directions] = {
     22: Directions(21, 23, 19, None),
     23: Directions(22, None, 14, None),
 }
+
+# Neighbors of every position in the order left, right, up, down; -1 where there is no neighbor
+NEIGHBORS: Tuple[Tuple[int, int, int, int], ...] = tuple(
+    (
+        -1 if d.left is None else d.left,
+        -1 if d.right is None else d.right,
+        -1 if d.up is None else d.up,
+        -1 if d.down is None else d.down,
+    )
+    for d in (positions[pos] for pos in range(len(positions)))
+)
+
+ALL_POSITIONS_MASK: int = (1 << len(positions)) - 1
+
+# Neighbors of every position as bit mask with one bit per neighbor position
+NEIGHBOR_MASKS: Tuple[int, ...] = tuple(
+    positions[pos].mask for pos in range(len(positions))
+)
+
+
+def neighbors(pos: int) -> Tuple[int, int, int, int]:
+    """
+    Returns the neighbors of a position in the order left, right, up, down, -1 meaning no neighbor.
+    :param pos: the position.
+    """
+    return NEIGHBORS[pos]
+
+
+def has_neighbor(pos: int, query: int) -> bool:
+    """
+    Checks if query is a direct neighbor of pos.
+    :param pos: the position.
+    :param query: the position to check.
+    """
+    return (NEIGHBOR_MASKS[pos] >> query) & 1 == 1
+
+
+def legal_destinations(src: int, occupied: int, can_jump: bool = False) -> int:
+    """
+    Returns the free positions a stone can move to from a position as bit mask.
+    :param src: the position to move from.
+    :param occupied: bit mask of all occupied positions.
+    :param can_jump: if the stone may jump to any free position instead of only to neighbors.
+    """
+    if can_jump:
+        return ALL_POSITIONS_MASK & ~occupied
+    return NEIGHBOR_MASKS[src] & ~occupied
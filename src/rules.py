@@ -1,9 +1,12 @@
 import enum
-from typing import Any, Dict, Optional
-from xmlrpc.client import boolean
+import logging
+from typing import Any, Dict, Optional, Tuple
 
 from board import Color, Event, MillGameBoard
-from positions import Directions, positions
+from mills import mill_completed_at
+from positions import legal_destinations
+
+logger = logging.getLogger(__name__)
 
 
 class Phase(enum.Enum):
@@ -25,15 +28,28 @@ Mill game rules engine.
 
 
 class MillRules:
-    _waiting_for_stone_removal_col: Optional[Color] = None
-    _white_stones_set = 0
-    _black_stones_set = 0
+    __slots__ = (
+        "_phase",
+        "_board",
+        "_last_move_col",
+        "_waiting_for_stone_removal_col",
+        "_white_stones_set",
+        "_black_stones_set",
+        "_next_action",
+        "_next_turn_col",
+    )
 
     def __init__(self, board: MillGameBoard):
         self._phase: Phase = Phase.SET
         self._board = board
         self._board.register_event_handler(self._board_event_handler)
         self._last_move_col: Optional[Color] = None
+        self._waiting_for_stone_removal_col: Optional[Color] = None
+        self._white_stones_set = 0
+        self._black_stones_set = 0
+        self._next_action: NextAction
+        self._next_turn_col: Color
+        self._recompute_next_action()
 
     def get_phase(self) -> Phase:
         """
@@ -48,47 +64,26 @@ class MillRules:
         :param position: number of the position.
         :param color: the color of the stone to be placed.
         """
-        if self._phase == Phase.SET and self._board.get_stone_col(position) == None and self.is_turn_col(color):
-            return True
-        else:
+        if self._phase is not Phase.SET or color is not self._next_turn_col:
             return False
+        return not (self._board.get_occupied_mask() >> position) & 1
 
     def is_turn_col(self, color: Color) -> bool:
         """
         Checks if the given color is the next to act.
         :param color: the color of the player.
         """
-        if self._waiting_for_stone_removal_col != None:
-            return color != self._waiting_for_stone_removal_col
-        elif self._last_move_col == None:
-            return color == Color.WHITE
-        else:
-            return color != self._last_move_col
+        return color is self._next_turn_col
 
     def may_select(self, position: int) -> bool:
         """
         Checks if the given position may be selected.
         :param position: the position to be checked.
         """
-        selected_color = self._board.get_stone_col(position)
-        if selected_color != None and (self.is_turn_col(selected_color)):
-            return True
-        else:
-            return False
+        return (self._board.get_mask(self._next_turn_col) >> position) & 1 == 1
 
     def get_next_action(self) -> NextAction:
-        if self.get_phase() == Phase.SET:
-            if self._waiting_for_stone_removal_col != None:
-                return NextAction.REMOVE
-            else:
-                return NextAction.SET
-        elif self.get_phase() == Phase.MOVE:
-            if self._waiting_for_stone_removal_col != None:
-                return NextAction.REMOVE
-            else:
-                return NextAction.MOVE
-        else:
-            return NextAction.RESET
+        return self._next_action
 
     def may_place(self, position: int, color: Color) -> bool:
         """
@@ -96,11 +91,9 @@ class MillRules:
         :param position: the position a stone shall be placed at.
         :param color: the color to be placed.
         """
-        pos_col = self._board.get_stone_col(position)
-        if self.get_phase() == Phase.SET and pos_col == None:
-            return True
-        else:
+        if self._phase is not Phase.SET:
             return False
+        return not (self._board.get_occupied_mask() >> position) & 1
 
     def may_move(self, from_pos: int, to_pos: int) -> bool:
         """
@@ -108,130 +101,136 @@ class MillRules:
         :param fromPos: the position to be moved from.
         :param fromTo: the position to be moved to.
         """
-        from_pos_col = self._board.get_stone_col(from_pos)
-        to_pos_col = self._board.get_stone_col(to_pos)
-
-        if (self._waiting_for_stone_removal_col == None
-                    and from_pos_col != None
-                    and self.is_turn_col(from_pos_col)
-                    and to_pos_col == None
-                    and self._move_valid(from_pos, to_pos, from_pos_col)
-                ):
-            return True
-        else:
+        if self._waiting_for_stone_removal_col is not None:
+            return False
+        if not (self._board.get_mask(self._next_turn_col) >> from_pos) & 1:
             return False
+        return self._move_valid(from_pos, to_pos, self._next_turn_col)
 
     def may_remove(self, position: int) -> bool:
         """
         Checks if the stone on the given position may be removed.
         :param position: the position to remove a stone from.
         """
-        if (self._waiting_for_stone_removal_col and self._waiting_for_stone_removal_col == self._board.get_stone_col(position)):
-            return True
-        return False
+        if self._waiting_for_stone_removal_col is None:
+            return False
+        return (self._board.get_mask(self._waiting_for_stone_removal_col) >> position) & 1 == 1
+
+    def snapshot(self) -> Tuple[Phase, Optional[Color], Optional[Color], int, int]:
+        """
+        Returns the state of the rules engine, e.g. to undo a move in a game tree search.
+        The board state must be saved along with it (see MillGameBoard.snapshot), which includes the
+        board events not yet delivered to this engine.
+        """
+        return (
+            self._phase,
+            self._last_move_col,
+            self._waiting_for_stone_removal_col,
+            self._white_stones_set,
+            self._black_stones_set,
+        )
+
+    def restore(self, snapshot: Tuple[Phase, Optional[Color], Optional[Color], int, int]) -> None:
+        """
+        Restores a state formerly returned by snapshot.
+        The board must be restored to the state saved along with it (see MillGameBoard.restore), which also
+        discards the board events of the undone moves so they are not delivered to this engine later.
+        :param snapshot: the state to restore.
+        """
+        (
+            self._phase,
+            self._last_move_col,
+            self._waiting_for_stone_removal_col,
+            self._white_stones_set,
+            self._black_stones_set,
+        ) = snapshot
+        self._recompute_next_action()
 
     def _check_mill(self, color: Color, position: int) -> None:
         """
         Checks if the given color created a mill with the set stone.
-        Checks for every positions left, right, up, down and with the position in center
+        Checks the (two) mill lines running through the position on the bit mask of the color.
         """
-        # Check for a horizontal or vertical mill at the current position
-        start_directions = positions.get(position)
-        if start_directions != None and (self._check_horizontal_mill(color, start_directions) or self._check_vertical_mill(color, start_directions)):
-            self._waiting_for_stone_removal_col = Color.BLACK if color == Color.WHITE else Color.WHITE
-
-        # Check for a horizontal mill one field left
-        if start_directions != None and start_directions.left != None and self._board.get_stone_col(start_directions.left) == color:
-            moved_directions = positions.get(start_directions.left)
-            if moved_directions != None and self._check_horizontal_mill(color, moved_directions):
-                self._waiting_for_stone_removal_col = Color.BLACK if color == Color.WHITE else Color.WHITE
-
-        # Check for a horizontal mill one field right
-        if start_directions != None and start_directions.right != None and self._board.get_stone_col(start_directions.right) == color:
-            moved_directions = positions.get(start_directions.right)
-            if moved_directions != None and self._check_horizontal_mill(color, moved_directions):
-                self._waiting_for_stone_removal_col = Color.BLACK if color == Color.WHITE else Color.WHITE
-
-        # Check for a vertical mill one field up
-        if start_directions != None and start_directions.up != None and self._board.get_stone_col(start_directions.up) == color:
-            moved_directions = positions.get(start_directions.up)
-            if moved_directions != None and self._check_vertical_mill(color, moved_directions):
-                self._waiting_for_stone_removal_col = Color.BLACK if color == Color.WHITE else Color.WHITE
-
-        # Check for a vertical mill one field down
-        if start_directions != None and start_directions.down != None and self._board.get_stone_col(start_directions.down) == color:
-            moved_directions = positions.get(start_directions.down)
-            if moved_directions != None and self._check_vertical_mill(color, moved_directions):
-                self._waiting_for_stone_removal_col = Color.BLACK if color == Color.WHITE else Color.WHITE
-
-    def _check_horizontal_mill(self, color: Color, directions: Directions | None) -> boolean:
-        return (directions != None and
-                (directions.left != None and self._board.get_stone_col(directions.left) == color and directions.right != None and self._board.get_stone_col(directions.right) == color))
-
-    def _check_vertical_mill(self, color: Color, directions: Directions | None) -> boolean:
-        return (directions != None and
-                (directions.up != None and self._board.get_stone_col(directions.up) == color and directions.down != None and self._board.get_stone_col(directions.down) == color))
+        if mill_completed_at(self._board.get_mask(color), position):
+            self._waiting_for_stone_removal_col = Color.BLACK if color is Color.WHITE else Color.WHITE
 
     def _board_event_handler(
         self, event: Event, event_data: Optional[Dict[str, Any]]
     ) -> None:
-        print("_board_event_handler rules")
         """
         The event handler of the rules engine. Handles all board events.
         :param event: an event that was raised from the board.
         :param eventData: the data for the raised event.
         """
-        black_stones = self._count_stones(Color.BLACK)
-        white_stones = self._count_stones(Color.WHITE)
-        if event == Event.STONE_SET:
-            if event_data != None:
+        logger.debug("_board_event_handler rules: %s", event)
+        if event is Event.STONE_SET:
+            if event_data is not None:
                 self._last_move_col = event_data["color"]
-                if self._last_move_col == Color.WHITE:
+                if self._last_move_col is Color.WHITE:
                     self._white_stones_set += 1
                 else:
                     self._black_stones_set += 1
                 self._check_mill(event_data["color"], event_data["position"])
             if self._white_stones_set >= 9 and self._black_stones_set >= 9:
                 self._advance_phase()
-        elif event == Event.STONE_REMOVED:
+        elif event is Event.STONE_REMOVED:
             self._waiting_for_stone_removal_col = None
-            if self.get_phase() == Phase.MOVE and black_stones <= 2 or white_stones <= 2:
+            black_stones = self._board.count_black()
+            white_stones = self._board.count_white()
+            if self.get_phase() is Phase.MOVE and black_stones <= 2 or white_stones <= 2:
                 self._advance_phase()
-        elif event == Event.STONE_MOVED:
-            if event_data != None:
+        elif event is Event.STONE_MOVED:
+            if event_data is not None:
                 self._last_move_col = event_data["color"]
                 self._check_mill(event_data["color"], event_data["to"])
-        elif event == Event.RESET:
+        elif event is Event.RESET:
             self._reset()
+        self._recompute_next_action()
 
     def _move_valid(self, from_pos: int, to_pos: int, color: Color) -> bool:
         """
         Checks if the move from from_pos to to_pos is valid for the given color.
-        Does only check move validity not constraints.
+        The target must be free and a neighbor, unless the color has only three stones left and may jump.
         :param from_pos: the position to move from.
         :param to_pos: the position to move to.
         :param color: the color of the player.
         """
-        position = positions.get(from_pos)
-        if position != None and (self._count_stones(color) <= 3 or position.has_neighbor(to_pos)):
-            return True
-        return False
+        destinations = legal_destinations(
+            from_pos, self._board.get_occupied_mask(), self._board.get_mask(color).bit_count() <= 3)
+        return (destinations >> to_pos) & 1 == 1
 
-    def _count_stones(self, color: Color) -> int:
+    def _recompute_next_action(self) -> None:
         """
-        Counts the stones of the given color on the board.
-        :param color: the color of the player.
+        Updates the cached next action and turn color.
+        Must be called after every change of phase, last moved color or color waiting for stone removal.
         """
-        num_stones = sum(x == color for x in self._board.get_stones().values())
-        return num_stones
+        if self._phase is Phase.SET:
+            if self._waiting_for_stone_removal_col is not None:
+                self._next_action = NextAction.REMOVE
+            else:
+                self._next_action = NextAction.SET
+        elif self._phase is Phase.MOVE:
+            if self._waiting_for_stone_removal_col is not None:
+                self._next_action = NextAction.REMOVE
+            else:
+                self._next_action = NextAction.MOVE
+        else:
+            self._next_action = NextAction.RESET
+
+        if self._waiting_for_stone_removal_col is not None:
+            self._next_turn_col = Color.BLACK if self._waiting_for_stone_removal_col is Color.WHITE else Color.WHITE
+        elif self._last_move_col is None:
+            self._next_turn_col = Color.WHITE
+        else:
+            self._next_turn_col = Color.BLACK if self._last_move_col is Color.WHITE else Color.WHITE
 
     def _advance_phase(self) -> None:
         """
         Advances the phase to the next one.
         """
-        if self._phase == Phase.SET:
+        if self._phase is Phase.SET:
             self._phase = Phase.MOVE
-        elif self._phase == Phase.MOVE:
+        elif self._phase is Phase.MOVE:
             self._phase = Phase.END
 
     def _reset(self) -> None: